@@ -2,10 +2,12 @@ import sys
 import uuid
 import os
 import shutil
+import time
 from pathlib import Path
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from typing import Optional
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
 # --- PATH SETUP ---
 # Detect if we are running from 'backend' dir or root
@@ -25,8 +27,10 @@ if str(BASE_DIR) not in sys.path:
 # Try/Except handles imports regardless of where you run the script from
 try:
     from backend import service
+    from backend.schemas import CaptionResponse, FeatureCaptionResponse
 except ImportError:
     import service
+    from schemas import CaptionResponse, FeatureCaptionResponse
 
 app = FastAPI()
 
@@ -56,11 +60,19 @@ async def startup_event():
 def home():
     return {"status": "online", "message": "CaptionNet Backend is Running"}
 
-@app.post("/predict")
-async def predict(file: UploadFile = File(...), strategy: str = "beam"):
+@app.get("/metrics")
+def metrics():
+    """Request and degradation counters for the caption service."""
+    return service.get_metrics()
+
+@app.post("/predict", response_model=CaptionResponse)
+async def predict(file: UploadFile = File(...), strategy: str = "beam", deadline_ms: Optional[float] = None):
     """
     Receives an image, saves it uniquely, runs AI, and cleans up.
+    If the server is busy or `deadline_ms` is close, the decoding strategy is
+    degraded (narrower beam, then greedy) and the one used is reported back.
     """
+    received_at = time.monotonic()
     # 1. Generate a unique filename to prevent Windows file locking conflicts
     unique_filename = f"{uuid.uuid4().hex}.jpg"
     temp_path = TEMP_DIR / unique_filename
@@ -70,10 +82,12 @@ async def predict(file: UploadFile = File(...), strategy: str = "beam"):
         with open(temp_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
         
-        # 3. Run Prediction
-        caption = service.generate_caption(str(temp_path), strategy)
+        # 3. Run Prediction (in a worker thread so queued requests stay visible to the service)
+        result = await run_in_threadpool(
+            service.generate_caption, str(temp_path), strategy, deadline_ms, received_at
+        )
         
-        return JSONResponse(content={"caption": caption})
+        return CaptionResponse(filename=file.filename or unique_filename, **result)
 
     except Exception as e:
         print(f"❌ ERROR processing request: {e}")
@@ -91,6 +105,45 @@ async def predict(file: UploadFile = File(...), strategy: str = "beam"):
             except Exception as cleanup_err:
                 print(f"⚠️ Cleanup error: {cleanup_err}")
 
+async def read_limited_body(request: Request, limit: int) -> bytes:
+    """Reads the request body, rejecting it with 413 as soon as it exceeds `limit` bytes."""
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+        raise HTTPException(status_code=413, detail=f"Body larger than {limit} bytes.")
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail=f"Body larger than {limit} bytes.")
+    return bytes(body)
+
+@app.post("/predict/features", response_model=FeatureCaptionResponse)
+async def predict_features(request: Request, dtype: str = "float32", strategy: str = "beam", deadline_ms: Optional[float] = None):
+    """
+    Captions precomputed VGG16 fc2 features (the features.pkl format) without
+    running the CNN. The body is raw little-endian float32 or float16 values,
+    one or more feature vectors back to back (Content-Type: application/octet-stream).
+    """
+    received_at = time.monotonic()
+    if not service.is_model_loaded():
+        raise HTTPException(status_code=503, detail="AI Model is not loaded.")
+    body = await read_limited_body(request, service.max_feature_body_bytes())
+
+    try:
+        features = service.parse_feature_body(body, dtype)
+        result = await run_in_threadpool(
+            service.generate_captions_from_features, features, strategy, deadline_ms, received_at
+        )
+        return FeatureCaptionResponse(**result)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ ERROR processing feature request: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     # Run on localhost
@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+import json
+import signal
+import argparse
+import subprocess
+import urllib.request
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# --- PATH SETUP ---
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+def child_pids(pid):
+    """All descendant process ids (Linux /proc only)."""
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(c) for c in f.read().split())
+    except FileNotFoundError:
+        return []
+    return children + [grandchild for c in children for grandchild in child_pids(c)]
+
+def memory_mb(pid):
+    """(RSS, PSS) in MB. PSS splits shared pages between the processes mapping them."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1]] = int(parts[1]) / 1024.0
+    return values.get("Rss"), values.get("Pss")
+
+def wait_until_ready(url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            time.sleep(1)
+    return False
+
+def post_features(url, body):
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/octet-stream"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=120) as response:
+        response.read()
+    return time.perf_counter() - start
+
+def run_load(url, body, concurrency, duration):
+    """Keeps `concurrency` requests in flight for `duration` seconds."""
+    latencies, errors = [], []
+    stop_at = time.time() + duration
+
+    def client():
+        while time.time() < stop_at:
+            try:
+                latencies.append(post_features(url, body))
+            except OSError as e:
+                errors.append(str(e))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    return latencies, errors
+
+def bench(workers, args, body):
+    port = args.port
+    command = [sys.executable, str(BASE_DIR / "backend" / "serve.py"), "--workers", str(workers), "--port", str(port)]
+    if args.shared_weights:
+        command.append("--shared-weights")
+    server = subprocess.Popen(command, cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_until_ready(f"http://127.0.0.1:{port}/", args.startup_timeout):
+            raise RuntimeError(f"Server with {workers} worker(s) did not start in {args.startup_timeout}s")
+        url = f"http://127.0.0.1:{port}/predict/features?strategy={args.strategy}"
+
+        # Warm every worker (graph tracing, page faults) before measuring
+        run_load(url, body, workers * 2, args.warmup)
+        latencies, errors = run_load(url, body, args.concurrency, args.duration)
+
+        # uvicorn only starts worker processes when workers > 1; a single
+        # worker runs inside serve.py itself
+        pids = [server.pid] if workers == 1 else child_pids(server.pid)
+        memory = [memory_mb(pid) for pid in pids]
+        # uvicorn's supervisor is tiny; the workers are the large processes
+        memory = sorted(memory, key=lambda m: m[0], reverse=True)[:workers]
+        latencies.sort()
+        return {
+            "workers": workers,
+            "requests": len(latencies),
+            "errors": len(errors),
+            "throughput_rps": len(latencies) / args.duration,
+            "latency_p50_s": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p95_s": latencies[int(len(latencies) * 0.95)] if latencies else None,
+            "rss_per_worker_mb": [round(rss, 1) for rss, _ in memory],
+            "pss_total_mb": round(sum(pss for _, pss in memory), 1),
+        }
+    finally:
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure throughput and memory as server workers scale.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--shared-weights", action="store_true")
+    parser.add_argument("--strategy", default="greedy")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="Optional JSON file for the results.")
+    args = parser.parse_args()
+
+    # Feature vectors skip JPEG decoding and VGG16, so this isolates the decoder
+    rng = np.random.default_rng(0)
+    body = np.maximum(rng.normal(0.0, 1.0, 4096), 0.0).astype('<f4').tobytes()
+
+    results = []
+    for workers in args.workers:
+        print(f"Benchmarking {workers} worker(s)...")
+        results.append(bench(workers, args, body))
+        print(json.dumps(results[-1]))
+
+    print("-" * 72)
+    print(f"{'workers':>7} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'RSS/worker MB':>14} {'total PSS MB':>13}")
+    for r in results:
+        rss = sum(r['rss_per_worker_mb']) / max(len(r['rss_per_worker_mb']), 1)
+        print(f"{r['workers']:>7} {r['throughput_rps']:>8.2f} {r['latency_p50_s'] or 0:>8.3f} "
+              f"{r['latency_p95_s'] or 0:>8.3f} {rss:>14.1f} {r['pss_total_mb']:>13.1f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -1,6 +1,15 @@
+from typing import List
 from pydantic import BaseModel
 
 class CaptionResponse(BaseModel):
     filename: str
     caption: str
-    strategy: str = "beam"
\ No newline at end of file
+    strategy: str = "beam"
+    beam_width: int
+    degraded: bool = False
+
+class FeatureCaptionResponse(BaseModel):
+    captions: List[str]
+    strategy: str = "beam"
+    beam_width: int
+    degraded: bool = False
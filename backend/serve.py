@@ -0,0 +1,41 @@
+import os
+import sys
+import argparse
+from pathlib import Path
+
+# --- PATH SETUP ---
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+
+from src import config
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the CaptionNet API with several worker processes.")
+    parser.add_argument("--workers", type=int, default=config.SERVING_WORKERS)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--shared-weights", action="store_true",
+                        help=f"Serve from the memory-mapped weight store at {config.WEIGHT_STORE_PATH}.")
+    args = parser.parse_args()
+
+    # Workers are started by uvicorn and read these at import time
+    if args.shared_weights:
+        os.environ["CAPTIONNET_SHARED_WEIGHTS"] = "1"
+
+    # Split the cores between workers so TensorFlow and NumPy do not oversubscribe
+    threads = str(max(1, (os.cpu_count() or 1) // args.workers))
+    for var in ("TF_NUM_INTRAOP_THREADS", "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, threads)
+    os.environ.setdefault("TF_NUM_INTEROP_THREADS", "1")
+
+    # app.py resolves the project root from the working directory
+    os.chdir(BASE_DIR)
+
+    import uvicorn
+    print(f"🚀 Starting {args.workers} worker(s) on {args.host}:{args.port} "
+          f"({'shared' if args.shared_weights else 'per-process'} weights, {threads} thread(s) each)")
+    # The OS spreads accepted connections across the workers sharing the socket
+    uvicorn.run("backend.app:app", host=args.host, port=args.port, workers=args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,12 @@ import sys
 import logging
 import traceback  # <--- NEW
 import gc
+import time
+import threading
+import collections
+from contextlib import contextmanager
 from pathlib import Path
+import numpy as np
 
 # --- PATH SETUP ---
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -21,8 +26,30 @@ logger = logging.getLogger("CaptionService")
 
 _caption_generator = None
 
+# --- LOAD-ADAPTIVE DECODING STATE ---
+# One request decodes at a time; the others wait on _decode_lock and count
+# towards the queue depth that drives degradation. _in_flight, the latency
+# estimates and the counters are only touched under _state_lock.
+_decode_lock = threading.Lock()
+_state_lock = threading.Lock()
+_in_flight = 0
+_latency_ewma = {}  # (source, strategy, k) -> smoothed decode seconds per caption
+_metrics = collections.Counter()
+
+# Accepted encodings for /predict/features bodies (explicitly little-endian)
+FEATURE_DTYPES = {"float32": np.dtype('<f4'), "float16": np.dtype('<f2')}
+
 def load_ai_model():
     global _caption_generator
+    if config.USE_SHARED_WEIGHTS:
+        if not config.WEIGHT_STORE_PATH.exists():
+            logger.error(f"❌ Weight store not found at {config.WEIGHT_STORE_PATH}")
+            raise FileNotFoundError("Shared weight store missing. Run: python -m src.weight_store")
+        logger.info("Loading AI Model from shared weight store...")
+        _caption_generator = CaptionGenerator(weight_store_path=config.WEIGHT_STORE_PATH)
+        logger.info("✅ AI Model successfully loaded.")
+        return
+
     if not config.FINAL_MODEL_PATH.exists():
         logger.error(f"❌ Model not found at {config.FINAL_MODEL_PATH}")
         raise FileNotFoundError("Model weights missing.")
@@ -31,7 +58,183 @@ def load_ai_model():
     _caption_generator = CaptionGenerator()
     logger.info("✅ AI Model successfully loaded.")
 
-def generate_caption(image_path: str, strategy: str = "beam"):
+@contextmanager
+def _track_in_flight():
+    global _in_flight
+    with _state_lock:
+        _in_flight += 1
+    try:
+        yield
+    finally:
+        with _state_lock:
+            _in_flight -= 1
+
+def _decoding_ladder(strategy, k):
+    """Cheapest-last list of (strategy, k): beam k, beam k-1, ..., beam 2, greedy."""
+    if strategy == 'greedy' or k <= 1:
+        return [('greedy', 1)]
+    return [('beam', width) for width in range(k, 1, -1)] + [('greedy', 1)]
+
+def _estimate_latency(source, strategy, k):
+    """
+    Smoothed decode time for (strategy, k) on one endpoint ('image' includes
+    the VGG16 pass, 'features' does not). Unseen settings are scaled from a
+    measured one for the same endpoint, since beam search runs roughly k
+    decoder passes per step.
+    """
+    with _state_lock:
+        if (source, strategy, k) in _latency_ewma:
+            return _latency_ewma[(source, strategy, k)]
+        known = [(key[2], seconds) for key, seconds in _latency_ewma.items() if key[0] == source]
+    if not known:
+        return None
+    known_k, seconds = known[0]
+    return seconds * k / known_k
+
+def _record_latency(source, strategy, k, seconds):
+    key = (source, strategy, k)
+    alpha = config.LATENCY_EWMA_ALPHA
+    with _state_lock:
+        previous = _latency_ewma.get(key)
+        _latency_ewma[key] = seconds if previous is None else alpha * seconds + (1 - alpha) * previous
+
+def _count(*names):
+    with _state_lock:
+        for name in names:
+            _metrics[name] += 1
+
+def plan_decoding(strategy, k, queue_depth, time_left=None, source='image'):
+    """
+    Picks the decoding settings for one request.
+    
+    Args:
+        strategy: Strategy the client asked for ('beam' or 'greedy').
+        k: Requested beam width.
+        queue_depth: Requests currently waiting behind this one.
+        time_left: Seconds until the request deadline, or None for no deadline.
+        source: Endpoint whose latency estimates apply ('image' or 'features').
+        
+    Returns:
+        (strategy, k, reason) where reason is None, 'queue' or 'deadline'.
+    """
+    ladder = _decoding_ladder(strategy, k)
+    rung, reason = 0, None
+
+    # 1. Queue pressure: narrow the beam as work piles up
+    if queue_depth >= config.GREEDY_QUEUE_DEPTH:
+        rung = len(ladder) - 1
+    elif config.DEGRADE_QUEUE_DEPTH > 0:
+        rung = min(queue_depth // config.DEGRADE_QUEUE_DEPTH, len(ladder) - 1)
+    if rung > 0:
+        reason = 'queue'
+
+    # 2. Deadline: keep stepping down while the estimate would overrun it
+    if time_left is not None:
+        while rung < len(ladder) - 1:
+            estimate = _estimate_latency(source, *ladder[rung])
+            if time_left > 0 and (estimate is None or estimate <= time_left):
+                break
+            rung += 1
+            reason = 'deadline'
+
+    chosen_strategy, chosen_k = ladder[rung]
+    return chosen_strategy, chosen_k, reason
+
+def get_metrics():
+    """Snapshot of the service counters and latency estimates."""
+    with _state_lock:
+        in_flight = _in_flight
+        counters = dict(_metrics)
+        estimates = dict(_latency_ewma)
+    return {
+        "counters": counters,
+        "in_flight": in_flight,
+        "latency_estimates_s": {f"{src}-{s}-{k}": round(v, 4) for (src, s, k), v in estimates.items()},
+    }
+
+def parse_feature_body(body: bytes, dtype: str = "float32"):
+    """
+    Decodes a raw little-endian float32/float16 request body into an
+    (n, feature_dim) array. Raises ValueError if the body does not match
+    the loaded decoder.
+    """
+    if _caption_generator is None:
+        raise RuntimeError("AI Model is not loaded.")
+    if dtype not in FEATURE_DTYPES:
+        raise ValueError(f"dtype must be one of {sorted(FEATURE_DTYPES)}, got '{dtype}'.")
+
+    np_dtype = FEATURE_DTYPES[dtype]
+    feature_dim = _caption_generator.feature_dim
+    row_bytes = feature_dim * np_dtype.itemsize
+    if len(body) == 0 or len(body) % row_bytes != 0:
+        raise ValueError(f"Body must hold a whole number of {feature_dim}-d {dtype} vectors ({row_bytes} bytes each), got {len(body)} bytes.")
+
+    batch_size = len(body) // row_bytes
+    if batch_size > config.MAX_FEATURE_BATCH:
+        raise ValueError(f"At most {config.MAX_FEATURE_BATCH} vectors per request, got {batch_size}.")
+    return np.frombuffer(body, dtype=np_dtype).reshape((batch_size, feature_dim))
+
+def is_model_loaded():
+    return _caption_generator is not None
+
+def max_feature_body_bytes():
+    """Largest valid /predict/features body: a full float32 batch."""
+    if _caption_generator is None:
+        raise RuntimeError("AI Model is not loaded.")
+    return config.MAX_FEATURE_BATCH * _caption_generator.feature_dim * FEATURE_DTYPES["float32"].itemsize
+
+def _adaptive_decode(run, source, strategy, deadline_ms, received_at, batch_size=1):
+    """
+    Runs `run(strategy, k)` under the decode lock with load-adaptive settings.
+    Latency estimates are kept per endpoint (`source`) and per caption, so
+    batches scale them by size.
+    """
+    if received_at is None:
+        received_at = time.monotonic()
+    requested_k = config.BEAM_WIDTH if strategy != 'greedy' else 1
+
+    with _track_in_flight():
+        with _decode_lock:
+            with _state_lock:
+                queue_depth = _in_flight - 1
+            time_left = None
+            if deadline_ms is not None:
+                # Compare the per-caption estimates against a per-caption budget
+                time_left = (deadline_ms / 1000.0 - (time.monotonic() - received_at)) / batch_size
+
+            chosen, k, reason = plan_decoding(strategy, requested_k, queue_depth, time_left, source)
+
+            _count("requests_total")
+            if reason is not None:
+                _count(
+                    "degraded_total",
+                    f"degraded_{reason}_total",
+                    f"degraded_to_{chosen}{'' if chosen == 'greedy' else f'_k{k}'}_total",
+                )
+                logger.info(f"Degraded {strategy} k={requested_k} -> {chosen} k={k} ({reason}, queue={queue_depth}, time_left={time_left})")
+
+            start = time.monotonic()
+            result = run(chosen, k)
+            _record_latency(source, chosen, k, (time.monotonic() - start) / batch_size)
+
+    if deadline_ms is not None and (time.monotonic() - received_at) * 1000.0 > deadline_ms:
+        _count("deadline_missed_total")
+
+    return result, {"strategy": chosen, "beam_width": k, "degraded": reason is not None}
+
+def generate_caption(image_path: str, strategy: str = "beam", deadline_ms: float = None, received_at: float = None):
+    """
+    Captions an image, degrading the decoding strategy under load.
+    
+    Args:
+        image_path: Path of the uploaded image.
+        strategy: Strategy requested by the client.
+        deadline_ms: Optional latency budget for the whole request.
+        received_at: time.monotonic() when the request arrived (defaults to now).
+        
+    Returns:
+        Dict with 'caption', 'strategy', 'beam_width' and 'degraded'.
+    """
     global _caption_generator
     
     if _caption_generator is None:
@@ -39,11 +242,14 @@ def generate_caption(image_path: str, strategy: str = "beam"):
     
     try:
         print(f"DEBUG: Processing image at {image_path}")
-        caption = _caption_generator.generate_caption(image_path, strategy=strategy)
+        caption, decoding = _adaptive_decode(
+            lambda chosen, k: _caption_generator.generate_caption(image_path, strategy=chosen, k=k),
+            'image', strategy, deadline_ms, received_at
+        )
         
         gc.collect()
         
-        return caption
+        return {"caption": caption, **decoding}
         
     except Exception as e:
         print("\n" + "="*50)
@@ -51,3 +257,25 @@ def generate_caption(image_path: str, strategy: str = "beam"):
         traceback.print_exc()
         print("="*50 + "\n")
         raise e
+
+def generate_captions_from_features(features, strategy: str = "beam", deadline_ms: float = None, received_at: float = None):
+    """
+    Captions precomputed VGG16 fc2 features without running the CNN.
+    
+    Args:
+        features: (n, feature_dim) or (feature_dim,) float32/float16 array.
+        strategy, deadline_ms, received_at: As for generate_caption.
+        
+    Returns:
+        Dict with 'captions', 'strategy', 'beam_width' and 'degraded'.
+    """
+    if _caption_generator is None:
+        raise RuntimeError("AI Model is not loaded.")
+
+    # Validate before queueing so bad input never waits for the lock
+    photos = _caption_generator.prepare_features(features)
+    captions, decoding = _adaptive_decode(
+        lambda chosen, k: _caption_generator.generate_captions_from_features(photos, strategy=chosen, k=k),
+        'features', strategy, deadline_ms, received_at, batch_size=len(photos)
+    )
+    return {"captions": captions, **decoding}
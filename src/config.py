@@ -18,16 +18,26 @@ CAPTION_FILE = RAW_DATA_DIR / "caption" / "Flickr8k.token.txt"
 FEATURES_DICT_PATH = PROCESSED_DATA_DIR / "features.pkl"
 DESCRIPTIONS_DICT_PATH = PROCESSED_DATA_DIR / "descriptions.txt"
 TOKENIZER_PATH = PROCESSED_DATA_DIR / "tokenizer.pkl"
+FEATURE_SHARDS_DIR = PROCESSED_DATA_DIR / "feature_shards"  # Incremental extraction stores
 
 # --- MODEL ARTIFACTS ---
 MODELS_DIR = BASE_DIR / "models"
 CHECKPOINT_DIR = MODELS_DIR / "checkpoints"
 FINAL_MODEL_PATH = MODELS_DIR / "final_model.h5"
+WEIGHT_STORE_PATH = MODELS_DIR / "weights.bin"  # Memory-mapped weights shared by server workers
+PROFILE_DIR = MODELS_DIR / "profile"
+PROFILE_LOG_PATH = PROFILE_DIR / "train_profile.jsonl"
+PROFILE_TRACE_DIR = PROFILE_DIR / "trace"
 
 # --- HYPERPARAMETERS ---
 # Image processing
 IMG_SIZE = (224, 224)   # Standard for VGG16/ResNet
 IMG_SHAPE = (224, 224, 3)
+EXTRACTION_CHECKPOINT_EVERY = 500  # Save the shard store after this many new images
+
+# Vocabulary
+MIN_WORD_FREQ = 1       # Words seen fewer times map to UNK_TOKEN (1 keeps every word)
+UNK_TOKEN = "<unk>"
 
 # Model Architecture
 VOCAB_SIZE = None       # Will be set dynamically after preprocessing
@@ -40,11 +50,23 @@ DROPOUT = 0.5           # Regularization rate
 BATCH_SIZE = 32         # Reduce to 16 if you run out of memory
 EPOCHS = 20
 LEARNING_RATE = 0.001
+SAMPLED_SOFTMAX = False # Train with a sampled softmax head (inference still uses the full softmax)
+NUM_SAMPLED = 512       # Negative classes sampled per batch by the sampled softmax head
+
+# --- SERVING ---
+BEAM_WIDTH = 3              # Beam width used when the server is not under load
+DEGRADE_QUEUE_DEPTH = 2     # Each this-many waiting requests narrows the beam by one
+GREEDY_QUEUE_DEPTH = 6      # Waiting requests at which everyone falls back to greedy
+LATENCY_EWMA_ALPHA = 0.2    # Smoothing for the per-strategy decode latency estimates
+MAX_FEATURE_BATCH = 64      # Max feature vectors per /predict/features request
+SERVING_WORKERS = 1         # Server processes started by backend/serve.py
+# Set CAPTIONNET_SHARED_WEIGHTS=1 to serve from WEIGHT_STORE_PATH (see src/weight_store.py)
+USE_SHARED_WEIGHTS = os.environ.get("CAPTIONNET_SHARED_WEIGHTS", "0") == "1"
 
 # --- UTILS ---
 def make_directories():
     """Ensure all necessary directories exist before running scripts."""
-    dirs = [PROCESSED_DATA_DIR, MODELS_DIR, CHECKPOINT_DIR]
+    dirs = [PROCESSED_DATA_DIR, FEATURE_SHARDS_DIR, MODELS_DIR, CHECKPOINT_DIR]
     for d in dirs:
         d.mkdir(parents=True, exist_ok=True)
 
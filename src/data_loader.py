@@ -2,7 +2,7 @@ import numpy as np
 from tensorflow.keras.preprocessing.sequence import pad_sequences
 from tensorflow.keras.utils import to_categorical
 
-def create_sequences(tokenizer, max_length, desc_list, photo, vocab_size):
+def create_sequences(tokenizer, max_length, desc_list, photo, vocab_size, sparse_targets=False):
     """
     Creates input-output sequence pairs for a single image.
     
@@ -12,11 +12,12 @@ def create_sequences(tokenizer, max_length, desc_list, photo, vocab_size):
         desc_list: List of caption strings for this specific image.
         photo: The 4096-dim feature vector for this image.
         vocab_size: Size of the vocabulary.
+        sparse_targets: Return target word ids instead of one-hot vectors.
         
     Returns:
         X1: List of image vectors.
         X2: List of input text sequences.
-        y: List of output target words (one-hot encoded).
+        y: List of output target words (one-hot encoded, or ids if sparse_targets).
     """
     X1, X2, y = list(), list(), list()
     
@@ -35,7 +36,8 @@ def create_sequences(tokenizer, max_length, desc_list, photo, vocab_size):
             
             # Encode output sequence (One-Hot Encoding)
             # This creates a sparse vector the size of the vocab
-            out_seq = to_categorical([out_seq], num_classes=vocab_size)[0]
+            if not sparse_targets:
+                out_seq = to_categorical([out_seq], num_classes=vocab_size)[0]
             
             # Store
             X1.append(photo)
@@ -44,7 +46,12 @@ def create_sequences(tokenizer, max_length, desc_list, photo, vocab_size):
             
     return np.array(X1), np.array(X2), np.array(y)
 
-def data_generator(descriptions, photos, tokenizer, max_length, vocab_size, batch_size=32):
+def data_generator(descriptions, photos, tokenizer, max_length, vocab_size, batch_size=32, sparse_targets=False):
+    """
+    Yields ({'image_input', 'text_input'}, one_hot_targets) batches forever.
+    With sparse_targets=True (sampled softmax training) the target word ids
+    are passed as a 'target_input' model input instead, with no y.
+    """
     keys = list(descriptions.keys())
     print(f"DEBUG: Generator started. Total keys: {len(keys)}")
     print(f"DEBUG: Sample Photo Key: {list(photos.keys())[0] if photos else 'EMPTY'}")
@@ -71,7 +78,7 @@ def data_generator(descriptions, photos, tokenizer, max_length, vocab_size, batc
                 photo = np.array(photo).flatten()
                 
                 in_img, in_seq, out_word = create_sequences(
-                    tokenizer, max_length, desc_list, photo, vocab_size
+                    tokenizer, max_length, desc_list, photo, vocab_size, sparse_targets
                 )
                 
                 for k in range(len(in_img)):
@@ -84,14 +91,21 @@ def data_generator(descriptions, photos, tokenizer, max_length, vocab_size, batc
                 # Only print the first batch to confirm it works
                 if count == 1:
                     print(f"DEBUG: Yielding first batch of size {len(input_imgs)}")
-                    
-                yield (
-                    {
-                        'image_input': np.array(input_imgs), 
-                        'text_input': np.array(input_seqs)
-                    }, 
-                    np.array(output_words)
-                )
+
+                if sparse_targets:
+                    yield {
+                        'image_input': np.array(input_imgs),
+                        'text_input': np.array(input_seqs),
+                        'target_input': np.array(output_words).reshape((-1, 1))
+                    }
+                else:
+                    yield (
+                        {
+                            'image_input': np.array(input_imgs), 
+                            'text_input': np.array(input_seqs)
+                        }, 
+                        np.array(output_words)
+                    )
             else:
                  # If we found NO valid data in this batch, warn the user
                  print(f"WARNING: Batch {i} was empty. Mismatch between photos and captions?")
\ No newline at end of file
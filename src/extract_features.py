@@ -1,5 +1,7 @@
 import os
 import pickle
+import hashlib
+import argparse
 import numpy as np
 from tensorflow.keras.applications.vgg16 import VGG16, preprocess_input
 from tensorflow.keras.preprocessing.image import load_img, img_to_array
@@ -12,6 +14,8 @@ try:
 except ImportError:
     import config
 
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
 def load_extraction_model():
     print("Loading VGG16 model...")
     # Load VGG16
@@ -25,6 +29,19 @@ def load_extraction_model():
     print("VGG16 loaded. Output dimension: 4096.")
     return model
 
+def list_images(directory):
+    """Returns the sorted image filenames in a directory."""
+    all_files = os.listdir(directory)
+    return sorted(f for f in all_files if f.lower().endswith(IMAGE_EXTENSIONS))
+
+def load_image(filename):
+    """Loads an image file as a preprocessed (1, 224, 224, 3) VGG16 batch."""
+    # VGG16 expects 224x224
+    image = load_img(filename, target_size=(224, 224), color_mode='rgb')
+    image = img_to_array(image)
+    image = image.reshape((1, image.shape[0], image.shape[1], image.shape[2]))
+    return preprocess_input(image) # VGG16 specific preprocessing
+
 def extract_features(directory):
     # 1. Verify Directory
     if not os.path.exists(directory):
@@ -33,8 +50,7 @@ def extract_features(directory):
 
     # 2. List Files
     print(f"Scanning directory: {directory}")
-    all_files = os.listdir(directory)
-    valid_images = [f for f in all_files if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
+    valid_images = list_images(directory)
     print(f"✅ Found {len(valid_images)} valid images.")
 
     if len(valid_images) == 0:
@@ -50,11 +66,7 @@ def extract_features(directory):
     for name in tqdm(valid_images):
         filename = os.path.join(directory, name)
         try:
-            # VGG16 expects 224x224
-            image = load_img(filename, target_size=(224, 224), color_mode='rgb')
-            image = img_to_array(image)
-            image = image.reshape((1, image.shape[0], image.shape[1], image.shape[2]))
-            image = preprocess_input(image) # VGG16 specific preprocessing
+            image = load_image(filename)
             
             # Extract features
             feature = model.predict(image, verbose=0)
@@ -68,16 +80,206 @@ def extract_features(directory):
         
     return features
 
+# --- INCREMENTAL EXTRACTION ---
+# Each shard keeps a store on disk with two maps:
+#   'hashes': {sha256 of the file bytes: feature}
+#   'images': {image_id: sha256}
+# Features are keyed by content, so renamed or copied images are only run
+# through VGG16 once, and a restarted run skips everything already stored.
+
+def hash_file(filename, chunk_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def shard_for_hash(content_hash, num_shards):
+    """Assigns a content hash to a shard, so identical files always share one."""
+    return int(content_hash[:16], 16) % num_shards
+
+def shard_path(shard_index, num_shards):
+    return config.FEATURE_SHARDS_DIR / f"shard-{shard_index:03d}-of-{num_shards:03d}.pkl"
+
+def load_store(path):
+    """Loads a shard store, or returns an empty one if it does not exist yet."""
+    if not os.path.exists(path):
+        return {'hashes': {}, 'images': {}}
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def seed_store(shard_index, num_shards):
+    """
+    Starts a store for a new shard layout from the features every other
+    layout already computed, so changing --num-shards does not rerun VGG16.
+    """
+    store = {'hashes': {}, 'images': {}}
+    for other in sorted(config.FEATURE_SHARDS_DIR.glob("shard-*.pkl")):
+        for content_hash, feature in load_store(other)['hashes'].items():
+            if shard_for_hash(content_hash, num_shards) == shard_index:
+                store['hashes'][content_hash] = feature
+    return store
+
+def save_store(store, path):
+    """Writes a shard store atomically, so a crash never leaves a torn file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(store, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def extract_features_incremental(directory, shard_index=0, num_shards=1,
+                                 checkpoint_every=config.EXTRACTION_CHECKPOINT_EVERY):
+    """
+    Resumable extraction for one shard of a directory.
+    
+    Args:
+        directory: Folder containing the images.
+        shard_index: Which shard this process is responsible for.
+        num_shards: Total number of extraction processes splitting the folder.
+        checkpoint_every: Save the store after this many new VGG16 passes.
+        
+    Returns:
+        The shard store ({'hashes': ..., 'images': ...}).
+    """
+    if not os.path.exists(directory):
+        print(f"❌ ERROR: Directory not found: {directory}")
+        return None
+    if not 0 <= shard_index < num_shards:
+        raise ValueError(f"shard_index must be in [0, {num_shards}), got {shard_index}")
+
+    path = shard_path(shard_index, num_shards)
+    store = load_store(path) if os.path.exists(path) else seed_store(shard_index, num_shards)
+    print(f"Shard {shard_index + 1}/{num_shards}: {len(store['hashes'])} features already stored in {path}")
+
+    valid_images = list_images(directory)
+    print(f"✅ Found {len(valid_images)} valid images.")
+
+    model = None
+    pending = 0
+    computed, reused = 0, 0
+    current_ids = set()  # Images in the folder that currently hash into this shard
+    
+    try:
+        for name in tqdm(valid_images, desc=f"Shard {shard_index}"):
+            filename = os.path.join(directory, name)
+            image_id = os.path.splitext(name)[0]
+            try:
+                content_hash = hash_file(filename)
+            except OSError as e:
+                print(f"⚠️ Failed to read {name}: {e}")
+                continue
+
+            if shard_for_hash(content_hash, num_shards) != shard_index:
+                continue
+            current_ids.add(image_id)
+
+            if content_hash not in store['hashes']:
+                # Only load VGG16 once there is actually something new to do
+                if model is None:
+                    model = load_extraction_model()
+                try:
+                    store['hashes'][content_hash] = model.predict(load_image(filename), verbose=0)
+                except Exception as e:
+                    print(f"⚠️ Failed to process {name}: {e}")
+                    continue
+                computed += 1
+                pending += 1
+            else:
+                reused += 1
+
+            if store['images'].get(image_id) != content_hash:
+                store['images'][image_id] = content_hash
+                pending += 1
+
+            if pending >= checkpoint_every:
+                save_store(store, path)
+                pending = 0
+    except KeyboardInterrupt:
+        print("\nExtraction interrupted. Checkpointing progress...")
+        save_store(store, path)
+        raise
+
+    # A full pass finished: forget images that were deleted or whose edited
+    # content now hashes into another shard, so merge never sees stale entries
+    stale = [image_id for image_id in store['images'] if image_id not in current_ids]
+    for image_id in stale:
+        del store['images'][image_id]
+
+    # Then drop feature vectors no remaining image points to (old versions of edited images)
+    referenced = set(store['images'].values())
+    orphaned = [h for h in store['hashes'] if h not in referenced]
+    for content_hash in orphaned:
+        del store['hashes'][content_hash]
+
+    if pending > 0 or stale or orphaned:
+        save_store(store, path)
+
+    print(f"Shard {shard_index}: computed {computed}, reused {reused} (skipped or duplicate content), "
+          f"dropped {len(stale)} stale image(s) and {len(orphaned)} unused feature(s).")
+    return store
+
+def merge_shards(num_shards=1, output_path=config.FEATURES_DICT_PATH):
+    """
+    Combines the shard stores of one --num-shards layout into the usual
+    {image_id: feature} features.pkl. Duplicate images point at the same
+    array, which pickle writes only once.
+    
+    Raises:
+        ValueError: If two shards map the same image to different content,
+            which means one of them was not re-run after the image changed.
+    """
+    shard_files = [shard_path(i, num_shards) for i in range(num_shards)]
+    missing = [str(f) for f in shard_files if not os.path.exists(f)]
+    if missing:
+        print(f"❌ ERROR: Missing shard stores for a {num_shards}-shard layout: {', '.join(missing)}")
+        return {}
+
+    hashes, images = {}, {}
+    for shard_file in shard_files:
+        store = load_store(shard_file)
+        hashes.update(store['hashes'])
+        for image_id, content_hash in store['images'].items():
+            if images.get(image_id, content_hash) != content_hash:
+                raise ValueError(f"Conflicting features for '{image_id}' in {shard_file}. Re-run every shard over the current folder, then merge again.")
+            images[image_id] = content_hash
+
+    features = {image_id: hashes[h] for image_id, h in images.items() if h in hashes}
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    save_store(features, output_path)
+    print(f"🎉 Merged {len(shard_files)} shard(s): {len(features)} images, {len(hashes)} unique feature vectors -> {output_path}")
+    return features
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract VGG16 fc2 features for a folder of images.")
     # Use the hardcoded path that worked for you earlier
-    directory = r"D:\College\VIT\Sem_6\DL\CaptionNet\data\raw\images"
+    parser.add_argument("--directory", default=r"D:\College\VIT\Sem_6\DL\CaptionNet\data\raw\images")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Resumable, content-hash deduplicated extraction into shard stores.")
+    parser.add_argument("--shard-index", type=int, default=0)
+    parser.add_argument("--num-shards", type=int, default=1)
+    parser.add_argument("--checkpoint-every", type=int, default=config.EXTRACTION_CHECKPOINT_EVERY)
+    parser.add_argument("--merge", action="store_true",
+                        help="Merge the --num-shards shard stores into features.pkl (runs after extraction when combined with --incremental).")
+    args = parser.parse_args()
 
-    features = extract_features(directory)
-    
-    if len(features) > 0:
-        os.makedirs(os.path.dirname(config.FEATURES_DICT_PATH), exist_ok=True)
-        with open(config.FEATURES_DICT_PATH, 'wb') as f:
-            pickle.dump(features, f)
-        print(f"🎉 Success! Saved features for {len(features)} images to {config.FEATURES_DICT_PATH}")
+    if args.incremental:
+        extract_features_incremental(args.directory, args.shard_index, args.num_shards, args.checkpoint_every)
+        # A single-shard run can produce features.pkl straight away
+        if args.merge or args.num_shards == 1:
+            merge_shards(args.num_shards)
+    elif args.merge:
+        merge_shards(args.num_shards)
     else:
-        print("❌ Extraction failed.")
\ No newline at end of file
+        features = extract_features(args.directory)
+        
+        if len(features) > 0:
+            os.makedirs(os.path.dirname(config.FEATURES_DICT_PATH), exist_ok=True)
+            with open(config.FEATURES_DICT_PATH, 'wb') as f:
+                pickle.dump(features, f)
+            print(f"🎉 Success! Saved features for {len(features)} images to {config.FEATURES_DICT_PATH}")
+        else:
+            print("❌ Extraction failed.")
@@ -9,12 +9,20 @@ from tensorflow.keras.models import Model
 try:
     from src import config
     from src.model_builder import define_model
+    from src.weight_store import WeightStore, MmapDecoder, MmapEncoder
 except ImportError:
     import config
     from model_builder import define_model
+    from weight_store import WeightStore, MmapDecoder, MmapEncoder
 
 class CaptionGenerator:
-    def __init__(self):
+    def __init__(self, weight_store_path=None):
+        """
+        Args:
+            weight_store_path: Optional file written by src/weight_store.py. When
+                given, the decoder and VGG16 fc layers run in NumPy over a
+                read-only memory map that all server workers share.
+        """
         print("--- Loading Caption Generator (VGG16) ---")
         
         # 1. Load Tokenizer
@@ -24,6 +32,13 @@ class CaptionGenerator:
         
         self.vocab_size = len(self.tokenizer.word_index) + 1
         self.max_length = config.MAX_LENGTH if config.MAX_LENGTH else 34
+        # Present when the vocabulary was pruned (config.MIN_WORD_FREQ > 1)
+        self.unk_index = self.tokenizer.word_index.get(config.UNK_TOKEN)
+
+        if weight_store_path is not None:
+            self._load_shared(weight_store_path)
+            print("--- Caption Generator Ready (shared weights) ---")
+            return
         
         # 2. Rebuild & Load Weights
         print(f"Building Model Architecture (Vocab: {self.vocab_size}, MaxLen: {self.max_length})...")
@@ -34,6 +49,7 @@ class CaptionGenerator:
         except Exception as e:
             print(f"❌ CRITICAL ERROR loading model: {e}")
             raise e
+        self.feature_dim = int(self.model.inputs[0].shape[-1])
         
         # 3. Load VGG16 Feature Extractor
         print("Loading VGG16 Feature Extractor...")
@@ -43,6 +59,17 @@ class CaptionGenerator:
         
         print("--- Caption Generator Ready ---")
 
+    def _load_shared(self, weight_store_path):
+        print(f"Memory-mapping weights from {weight_store_path}...")
+        store = WeightStore(weight_store_path)
+        if store.meta.get('vocab_size') != self.vocab_size:
+            raise ValueError(f"Weight store vocab size {store.meta.get('vocab_size')} does not match tokenizer ({self.vocab_size}). Rebuild it with src/weight_store.py.")
+        self.max_length = store.meta.get('max_length', self.max_length)
+        self.model = MmapDecoder(store)
+        self.feature_dim = self.model.feature_dim
+        print("Loading VGG16 conv trunk (fc layers come from the weight store)...")
+        self.vgg_model = MmapEncoder(store)
+
     def extract_features(self, image_path):
         # VGG expects 224x224
         image = load_img(image_path, target_size=(224, 224), color_mode='rgb')
@@ -53,10 +80,33 @@ class CaptionGenerator:
         return feature
 
     def word_for_id(self, integer):
-        for word, index in self.tokenizer.word_index.items():
-            if index == integer:
-                return word
-        return None
+        return self.tokenizer.index_word.get(int(integer))
+
+    def _predict_next(self, photo, sequence):
+        """Next-word distribution from the full softmax, never choosing <unk>."""
+        yhat = self.model.predict([photo, sequence], verbose=0)
+        if self.unk_index is not None:
+            yhat[..., self.unk_index] = 0.0
+        return yhat
+
+    def prepare_features(self, features):
+        """
+        Validates precomputed encoder features (same format as features.pkl).
+        Accepts a single (feature_dim,) vector or a (n, feature_dim) batch of
+        float32/float16 values and returns a float32 (n, feature_dim) array.
+        """
+        features = np.asarray(features)
+        if features.dtype not in (np.float32, np.float16):
+            raise ValueError(f"Features must be float32 or float16, got {features.dtype}.")
+        if features.ndim == 1:
+            features = features.reshape((1, -1))
+        if features.ndim != 2 or features.shape[1] != self.feature_dim:
+            raise ValueError(f"Features must have shape ({self.feature_dim},) or (n, {self.feature_dim}), got {features.shape}.")
+        if features.shape[0] == 0:
+            raise ValueError("Feature batch is empty.")
+        if not np.all(np.isfinite(features)):
+            raise ValueError("Features contain NaN or infinite values.")
+        return features.astype(np.float32, copy=False)
 
     def generate_caption(self, image_path, strategy='beam', k=3):
         photo = self.extract_features(image_path)
@@ -65,12 +115,22 @@ class CaptionGenerator:
         else:
             return self._beam_search(photo, k)
 
+    def generate_captions_from_features(self, features, strategy='beam', k=3):
+        """
+        Captions precomputed VGG16 fc2 features, skipping the CNN entirely.
+        Returns one caption per row of `features`.
+        """
+        photos = self.prepare_features(features)
+        if strategy == 'greedy':
+            return self._greedy_search_batch(photos)
+        return [self._beam_search(photos[i:i + 1], k) for i in range(len(photos))]
+
     def _greedy_search(self, photo):
         in_text = 'startseq'
         for i in range(self.max_length):
             sequence = self.tokenizer.texts_to_sequences([in_text])[0]
             sequence = pad_sequences([sequence], maxlen=self.max_length)
-            yhat = self.model.predict([photo, sequence], verbose=0)
+            yhat = self._predict_next(photo, sequence)
             yhat = np.argmax(yhat)
             word = self.word_for_id(yhat)
             if word is None: break
@@ -78,6 +138,25 @@ class CaptionGenerator:
             if word == 'endseq': break
         return in_text.replace('startseq', '').replace('endseq', '').strip()
 
+    def _greedy_search_batch(self, photos):
+        """Greedy search for a batch of photos, one decoder call per step."""
+        texts = ['startseq'] * len(photos)
+        done = [False] * len(photos)
+        for i in range(self.max_length):
+            active = [j for j in range(len(photos)) if not done[j]]
+            if not active: break
+            sequences = self.tokenizer.texts_to_sequences([texts[j] for j in active])
+            sequences = pad_sequences(sequences, maxlen=self.max_length)
+            yhat = self._predict_next(photos[active], sequences)
+            for row, j in enumerate(active):
+                word = self.word_for_id(np.argmax(yhat[row]))
+                if word is None:
+                    done[j] = True
+                    continue
+                texts[j] += ' ' + word
+                if word == 'endseq': done[j] = True
+        return [t.replace('startseq', '').replace('endseq', '').strip() for t in texts]
+
     def _beam_search(self, photo, k=3):
         start_seq = self.tokenizer.texts_to_sequences(['startseq'])[0]
         sequences = [[start_seq, 0.0]]
@@ -89,7 +168,7 @@ class CaptionGenerator:
                     all_candidates.append([seq, score])
                     continue
                 padded_seq = pad_sequences([seq], maxlen=self.max_length)
-                yhat = self.model.predict([photo, padded_seq], verbose=0)[0]
+                yhat = self._predict_next(photo, padded_seq)[0]
                 top_k_indices = np.argsort(yhat)[-k:]
                 for word_index in top_k_indices:
                     new_score = score + np.log(yhat[word_index] + 1e-10)
@@ -1,12 +1,48 @@
+import tensorflow as tf
 from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Input, Dense, LSTM, Embedding, Dropout, add
+from tensorflow.keras.layers import Input, Dense, LSTM, Embedding, Dropout, Layer, add
 
 try:
     from src import config
 except ImportError:
     import config
 
-def define_model(vocab_size, max_length):
+class SampledSoftmax(Layer):
+    """
+    Training-time stand-in for Dense(vocab_size, activation='softmax').
+    It holds the same kernel/bias, but the loss only scores the target word
+    against `num_sampled` sampled words instead of the whole vocabulary.
+    Copy its weights into define_model() to get the full softmax back.
+    """
+    def __init__(self, vocab_size, num_sampled, **kwargs):
+        super().__init__(**kwargs)
+        self.vocab_size = vocab_size
+        self.num_sampled = num_sampled
+
+    def build(self, input_shape):
+        hidden_shape = input_shape[0]
+        self.kernel = self.add_weight(name='kernel', shape=(hidden_shape[-1], self.vocab_size), initializer='glorot_uniform')
+        self.bias = self.add_weight(name='bias', shape=(self.vocab_size,), initializer='zeros')
+        super().build(input_shape)
+
+    def call(self, inputs):
+        hidden, targets = inputs
+        loss = tf.nn.sampled_softmax_loss(
+            weights=tf.transpose(self.kernel),
+            biases=self.bias,
+            labels=tf.cast(targets, tf.int64),
+            inputs=hidden,
+            num_sampled=min(self.num_sampled, self.vocab_size - 1),
+            num_classes=self.vocab_size,
+        )
+        self.add_loss(tf.reduce_mean(loss))
+        return loss
+
+    def get_config(self):
+        base_config = super().get_config()
+        return {**base_config, 'vocab_size': self.vocab_size, 'num_sampled': self.num_sampled}
+
+def _decoder_body(vocab_size, max_length):
     # --- REVERTED: Input Shape is 4096 (VGG16) ---
     inputs1 = Input(shape=(4096,), name="image_input")
     fe1 = Dropout(0.5)(inputs1)
@@ -22,10 +58,31 @@ def define_model(vocab_size, max_length):
     # Decoder
     decoder1 = add([fe2, se3])
     decoder2 = Dense(256, activation='relu')(decoder1)
+    return inputs1, inputs2, decoder2
+
+def define_model(vocab_size, max_length):
+    inputs1, inputs2, decoder2 = _decoder_body(vocab_size, max_length)
     outputs = Dense(vocab_size, activation='softmax')(decoder2)
 
     # Compile
     model = Model(inputs=[inputs1, inputs2], outputs=outputs)
     model.compile(loss='categorical_crossentropy', optimizer='adam')
-    
-    return model
\ No newline at end of file
+
+    return model
+
+def define_training_model(vocab_size, max_length, num_sampled=config.NUM_SAMPLED):
+    """
+    Same network as define_model, trained with a sampled softmax head.
+    Expects the target word ids as a third input, 'target_input' (see
+    data_generator(sparse_targets=True)). Its weights load straight into
+    define_model() with set_weights() for full-softmax inference.
+    """
+    inputs1, inputs2, decoder2 = _decoder_body(vocab_size, max_length)
+    inputs3 = Input(shape=(1,), name="target_input", dtype='int64')
+    loss = SampledSoftmax(vocab_size, num_sampled)([decoder2, inputs3])
+
+    # The loss is added by the layer itself
+    model = Model(inputs=[inputs1, inputs2, inputs3], outputs=loss)
+    model.compile(optimizer='adam')
+
+    return model
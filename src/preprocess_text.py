@@ -1,5 +1,6 @@
 import string
 import pickle
+import argparse
 import collections
 from tensorflow.keras.preprocessing.text import Tokenizer
 from tqdm import tqdm
@@ -90,9 +91,11 @@ def save_descriptions(descriptions, filename):
     with open(filename, 'w') as file:
         file.write(data)
 
-def create_tokenizer(descriptions):
+def create_tokenizer(descriptions, min_word_freq=config.MIN_WORD_FREQ):
     """
     Fits a Keras Tokenizer on the cleaned text.
+    Words seen fewer than `min_word_freq` times are dropped from the
+    vocabulary and encoded as config.UNK_TOKEN instead.
     Returns: The fitted Tokenizer object.
     """
     # Collect all captions into a single list
@@ -100,11 +103,28 @@ def create_tokenizer(descriptions):
     for key in descriptions.keys():
         [all_captions.append(d) for d in descriptions[key]]
     
-    tokenizer = Tokenizer()
+    tokenizer = Tokenizer(oov_token=config.UNK_TOKEN if min_word_freq > 1 else None)
     tokenizer.fit_on_texts(all_captions)
+
+    if min_word_freq > 1:
+        prune_tokenizer(tokenizer, min_word_freq)
     
     return tokenizer
 
+def prune_tokenizer(tokenizer, min_word_freq):
+    """
+    Rebuilds word_index/index_word with only the words seen at least
+    `min_word_freq` times. The OOV token keeps index 1 and the rest stay
+    ordered by frequency, so len(word_index) + 1 is the pruned vocab size.
+    """
+    counts = sorted(tokenizer.word_counts.items(), key=lambda x: x[1], reverse=True)
+    # The sequence markers must survive whatever the threshold
+    kept = [w for w, c in counts if c >= min_word_freq or w in ('startseq', 'endseq')]
+    words = [tokenizer.oov_token] + kept
+    tokenizer.word_index = {w: i + 1 for i, w in enumerate(words)}
+    tokenizer.index_word = {i: w for w, i in tokenizer.word_index.items()}
+    return tokenizer
+
 def get_max_length(descriptions):
     """Calculates the longest caption in words."""
     all_captions = []
@@ -113,6 +133,11 @@ def get_max_length(descriptions):
     return max(len(d.split()) for d in all_captions)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean captions and build the tokenizer.")
+    parser.add_argument("--min-word-freq", type=int, default=config.MIN_WORD_FREQ,
+                        help="Words seen fewer times are replaced by the <unk> token.")
+    args = parser.parse_args()
+
     # 1. Load raw text
     print(f"Loading captions from: {config.CAPTION_FILE}")
     doc = load_doc(config.CAPTION_FILE)
@@ -129,7 +154,7 @@ if __name__ == "__main__":
     
     # 5. Build Tokenizer
     print("Building Tokenizer...")
-    tokenizer = create_tokenizer(cleaned_descriptions)
+    tokenizer = create_tokenizer(cleaned_descriptions, args.min_word_freq)
     
     # 6. Save Tokenizer
     print(f"Saving Tokenizer to {config.TOKENIZER_PATH}...")
@@ -143,6 +168,10 @@ if __name__ == "__main__":
     print("-" * 30)
     print(f"Preprocessing Complete.")
     print(f"Vocabulary Size: {vocab_size}")
+    if args.min_word_freq > 1:
+        total = sum(tokenizer.word_counts.values())
+        covered = sum(c for w, c in tokenizer.word_counts.items() if w in tokenizer.word_index)
+        print(f"Min Word Frequency: {args.min_word_freq} ({len(tokenizer.word_counts) - (vocab_size - 2)} words -> {config.UNK_TOKEN}, {covered / total:.2%} of tokens kept)")
     print(f"Max Description Length: {max_length}")
     print("-" * 30)
     print("ACTION REQUIRED: Update 'src/config.py' if you want to hardcode these values.")
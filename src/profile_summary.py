@@ -0,0 +1,95 @@
+import sys
+import json
+import argparse
+
+# Import config
+try:
+    from src import config
+except ImportError:
+    import config
+
+def load_profile(filename):
+    """Reads a TrainingProfiler JSONL log into a list of records."""
+    with open(filename, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def percentile(values, q):
+    if len(values) == 0:
+        return None
+    ordered = sorted(values)
+    index = min(int(round(q / 100.0 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+def collect_end(records, key):
+    return [r[key] for r in records if r.get('event') == 'train_end' and r.get(key) is not None]
+
+def summarize(records, skip_steps=1):
+    """
+    Aggregates the per-step records. The first `skip_steps` steps are ignored
+    because they include graph tracing and the batch Keras peeks at start-up.
+    """
+    steps = [r for r in records if r.get('event') == 'step'][skip_steps:]
+    profiled = [r for r in steps if 'wait_s' in r]
+
+    wait = [r['wait_s'] for r in profiled]
+    compute = [r['compute_s'] for r in profiled]
+    total_wait, total_compute = sum(wait), sum(compute)
+    total = total_wait + total_compute
+
+    def collect(key):
+        return [r[key] for r in steps if r.get(key) is not None]
+
+    return {
+        'steps': len(steps),
+        'wait_mean_s': total_wait / len(wait) if wait else None,
+        'wait_p95_s': percentile(wait, 95),
+        'compute_mean_s': total_compute / len(compute) if compute else None,
+        'compute_p95_s': percentile(compute, 95),
+        'input_bound_fraction': total_wait / total if total > 0 else None,
+        'input_bound_steps': sum(1 for r in profiled if r['wait_s'] > r['compute_s']),
+        'batch_size_mean': sum(collect('batch_size')) / len(collect('batch_size')) if collect('batch_size') else None,
+        'target_mb_max': max(collect('target_mb'), default=None),
+        'alloc_peak_mb_max': max(collect('alloc_peak_mb'), default=None),
+        'rss_mb_max': max(collect('rss_mb'), default=None),
+        'peak_rss_mb': max(collect_end(records, 'peak_rss_mb'), default=None),
+    }
+
+def format_value(value):
+    if value is None:
+        return 'n/a'
+    if isinstance(value, float):
+        return f"{value:.4f}"
+    return str(value)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a training profile log.")
+    parser.add_argument("log", nargs="?", default=str(config.PROFILE_LOG_PATH))
+    parser.add_argument("--skip-steps", type=int, default=1, help="Warm-up steps to ignore.")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+    args = parser.parse_args()
+
+    try:
+        records = load_profile(args.log)
+    except FileNotFoundError:
+        print(f"❌ ERROR: Profile log not found: {args.log}")
+        sys.exit(1)
+
+    summary = summarize(records, args.skip_steps)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        sys.exit(0)
+
+    print("-" * 30)
+    print(f"Profile: {args.log}")
+    if any(r.get('interrupted') for r in records):
+        print("(training was interrupted; summary covers the steps that ran)")
+    for key, value in summary.items():
+        print(f"{key:<22} {format_value(value)}")
+    print("-" * 30)
+    fraction = summary['input_bound_fraction']
+    if fraction is not None:
+        verdict = "INPUT-BOUND (batch building dominates)" if fraction > 0.5 else "COMPUTE-BOUND (model step dominates)"
+        print(f"Verdict: {verdict}")
+    begin = next((r for r in records if r.get('event') == 'train_begin'), {})
+    if begin.get('trace_dir'):
+        print(f"TF profiler trace: {begin['trace_dir']} (open with TensorBoard)")
@@ -0,0 +1,173 @@
+import os
+import sys
+import json
+import time
+import tracemalloc
+import collections
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+# Import config
+try:
+    from src import config
+except ImportError:
+    import config
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+def current_rss_mb():
+    """Current resident set size of this process in MB (Linux only, else None)."""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024.0 * 1024.0)
+
+class ProfiledGenerator:
+    """
+    Wraps a batch generator (e.g. data_generator) and records, for every batch,
+    how long it took to build, how many samples it holds and how large the
+    one-hot targets are. With track_memory=True it also records the tracemalloc
+    peak while the batch was being built.
+    
+    Train with workers=0 so Keras calls the generator synchronously inside
+    each step; the build time is then exactly the step's wait-for-data time.
+    """
+    def __init__(self, generator, track_memory=False):
+        self.generator = generator
+        self.track_memory = track_memory
+        self.records = collections.deque()
+        if track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.track_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        batch = next(self.generator)
+        elapsed = time.perf_counter() - start
+
+        inputs = batch[0] if isinstance(batch, tuple) else batch
+        targets = batch[1] if isinstance(batch, tuple) and len(batch) > 1 else None
+        if targets is None and isinstance(inputs, dict):
+            # Sampled softmax batches carry word ids as an input instead of one-hot y
+            targets = inputs.get('target_input')
+        first_input = next(iter(inputs.values())) if isinstance(inputs, dict) else inputs
+        record = {
+            'wait_s': elapsed,
+            'batch_size': int(len(first_input)),
+            'target_mb': targets.nbytes / (1024.0 * 1024.0) if targets is not None else None,
+        }
+        if self.track_memory:
+            record['alloc_peak_mb'] = tracemalloc.get_traced_memory()[1] / (1024.0 * 1024.0)
+        self.records.append(record)
+        return batch
+
+class TrainingProfiler(Callback):
+    """
+    Writes one JSON line per training step to log_path with the step's
+    wait-for-data time, compute time, batch size and memory figures.
+    
+    Args:
+        log_path: JSONL file to write (overwritten on train begin).
+        generator: The ProfiledGenerator feeding model.fit.
+        trace_steps: Optional (start, stop) global steps to capture with the
+            TensorFlow profiler (view in TensorBoard's Profile tab).
+        trace_dir: Where the TensorFlow profiler writes its trace.
+        flush_every: Flush the log every this-many steps.
+    
+    Keras does not call on_train_end when training is interrupted, so call
+    close() from the interrupt path to keep the log and trace complete.
+    """
+    def __init__(self, log_path=config.PROFILE_LOG_PATH, generator=None, trace_steps=None,
+                 trace_dir=config.PROFILE_TRACE_DIR, flush_every=100):
+        super().__init__()
+        self.log_path = log_path
+        self.flush_every = flush_every
+        self.generator = generator
+        self.trace_steps = trace_steps
+        self.trace_dir = trace_dir
+        self._log = None
+        self._tracing = False
+        self._epoch = 0
+        self._global_step = 0
+        self._step_start = None
+
+    def _write(self, record):
+        self._log.write(json.dumps(record) + '\n')
+
+    def on_train_begin(self, logs=None):
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        self._log = open(self.log_path, 'w')
+        self._write({
+            'event': 'train_begin',
+            'time': time.time(),
+            'trace_steps': list(self.trace_steps) if self.trace_steps else None,
+            'trace_dir': str(self.trace_dir) if self.trace_steps else None,
+            'peak_rss_mb': peak_rss_mb(),
+        })
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch = epoch
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.trace_steps and self._global_step == self.trace_steps[0]:
+            tf.profiler.experimental.start(str(self.trace_dir))
+            self._tracing = True
+        self._step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        step_s = time.perf_counter() - self._step_start
+        record = {
+            'event': 'step',
+            'epoch': self._epoch,
+            'step': batch,
+            'global_step': self._global_step,
+            'step_s': step_s,
+            'rss_mb': current_rss_mb(),
+            'loss': float(logs['loss']) if logs and 'loss' in logs else None,
+        }
+        if self.generator is not None and self.generator.records:
+            gen_record = self.generator.records.popleft()
+            record.update(gen_record)
+            record['compute_s'] = max(step_s - gen_record['wait_s'], 0.0)
+        self._write(record)
+
+        self._global_step += 1
+        if self._global_step % self.flush_every == 0:
+            self._log.flush()
+        if self._tracing and self._global_step >= self.trace_steps[1]:
+            tf.profiler.experimental.stop()
+            self._tracing = False
+
+    def on_epoch_end(self, epoch, logs=None):
+        self._log.flush()
+
+    def on_train_end(self, logs=None):
+        self.close()
+
+    def close(self, interrupted=False):
+        """Stops any running trace and writes the final record. Safe to call twice."""
+        if self._tracing:
+            tf.profiler.experimental.stop()
+            self._tracing = False
+        if self._log is None or self._log.closed:
+            return
+        self._write({'event': 'train_end', 'time': time.time(), 'peak_rss_mb': peak_rss_mb(),
+                     'interrupted': interrupted})
+        self._log.close()
@@ -1,4 +1,5 @@
 import pickle
+import argparse
 import numpy as np
 from tensorflow.keras.callbacks import ModelCheckpoint, ReduceLROnPlateau
 from tensorflow.keras.models import load_model
@@ -6,7 +7,8 @@ from tensorflow.keras.models import load_model
 # Import local modules
 import config
 from data_loader import data_generator
-from model_builder import define_model
+from model_builder import define_model, define_training_model
+from profiling import ProfiledGenerator, TrainingProfiler
 from preprocess_text import load_doc, load_descriptions, clean_descriptions
 
 def load_set_of_image_ids(filename):
@@ -43,7 +45,16 @@ def load_photo_features(filename, dataset_ids):
     features = {k: all_features[k] for k in dataset_ids if k in all_features}
     return features
 
-def train():
+def train(profile=False, track_memory=False, trace_steps=None, sampled_softmax=config.SAMPLED_SOFTMAX):
+    """
+    Trains the caption model.
+    
+    Args:
+        profile: Log per-step wait-for-data vs compute time to config.PROFILE_LOG_PATH.
+        track_memory: With profile, also record tracemalloc peaks while building batches.
+        trace_steps: With profile, (start, stop) global steps to capture with the TF profiler.
+        sampled_softmax: Train with the sampled softmax head; the saved model keeps the full softmax.
+    """
     print("--- 1. Loading Data & Configurations ---")
     
     # Load Tokenizer
@@ -76,11 +87,19 @@ def train():
 
     
     print("--- 2. Building Model ---")
-    model = define_model(vocab_size, max_length)
+    if sampled_softmax:
+        print(f"Using sampled softmax ({config.NUM_SAMPLED} sampled words per batch)")
+        model = define_training_model(vocab_size, max_length, config.NUM_SAMPLED)
+    else:
+        model = define_model(vocab_size, max_length)
     
     # Define Checkpoints
     # Save the model whenever 'loss' improves (lowers)
-    filepath = str(config.CHECKPOINT_DIR / "model-ep{epoch:03d}-loss{loss:.3f}.h5")
+    # Sampled-softmax checkpoints hold the training architecture (with the
+    # target input), so they get their own prefix; only final_model.h5 is
+    # converted back to the inference model
+    prefix = "train-sampled" if sampled_softmax else "model"
+    filepath = str(config.CHECKPOINT_DIR / (prefix + "-ep{epoch:03d}-loss{loss:.3f}.h5"))
     checkpoint = ModelCheckpoint(filepath, monitor='loss', verbose=1, save_best_only=True, mode='min')
     
     # Reduce Learning Rate if loss stops improving
@@ -91,25 +110,60 @@ def train():
 
     print("--- 3. Starting Training ---")
     # Create the data generator
-    generator = data_generator(train_descriptions, train_features, tokenizer, max_length, vocab_size, config.BATCH_SIZE)
+    generator = data_generator(train_descriptions, train_features, tokenizer, max_length, vocab_size, config.BATCH_SIZE,
+                               sparse_targets=sampled_softmax)
     
     # Calculate steps per epoch (Total Samples / Batch Size)
     steps = len(train_descriptions) // config.BATCH_SIZE
 
+    # Keras prefetches one batch from generators (workers=1). When profiling we
+    # turn that off so each batch is built inside its own step and the
+    # wait/compute split is exact.
+    workers = 1
+    profiler = None
+    if profile:
+        generator = ProfiledGenerator(generator, track_memory=track_memory)
+        profiler = TrainingProfiler(generator=generator, trace_steps=trace_steps)
+        callbacks_list.append(profiler)
+        workers = 0
+        print(f"Profiling enabled. Writing step log to {config.PROFILE_LOG_PATH}")
+
     try:
         model.fit(
             generator,
             epochs=config.EPOCHS,
             steps_per_epoch=steps,
             callbacks=callbacks_list,
+            workers=workers,
             verbose=1
         )
     except KeyboardInterrupt:
         print("\nTraining interrupted by user. Saving current model...")
+        if profiler is not None:
+            # Keras skips on_train_end on interrupt; close the log and any trace ourselves
+            profiler.close(interrupted=True)
         
+    if sampled_softmax:
+        # Move the trained weights into the full-softmax model used for inference
+        inference_model = define_model(vocab_size, max_length)
+        inference_model.set_weights(model.get_weights())
+        model = inference_model
+
     # Save Final Model
     print(f"Saving final model to {config.FINAL_MODEL_PATH}")
     model.save(config.FINAL_MODEL_PATH)
 
 if __name__ == "__main__":
-    train()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the caption model.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Log wait-for-data vs compute time per step (summarize with profile_summary.py).")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="With --profile, also track tracemalloc peaks while building batches.")
+    parser.add_argument("--trace-steps", type=int, nargs=2, metavar=("START", "STOP"),
+                        help="With --profile, capture a TensorFlow profiler trace for these global steps.")
+    parser.add_argument("--sampled-softmax", action=argparse.BooleanOptionalAction, default=config.SAMPLED_SOFTMAX,
+                        help="Train with a sampled softmax head over config.NUM_SAMPLED words (default: config.SAMPLED_SOFTMAX).")
+    args = parser.parse_args()
+
+    train(profile=args.profile, track_memory=args.profile_memory, trace_steps=args.trace_steps,
+          sampled_softmax=args.sampled_softmax)
\ No newline at end of file
@@ -0,0 +1,154 @@
+import json
+import time
+import argparse
+import numpy as np
+from nltk.translate.bleu_score import corpus_bleu, SmoothingFunction
+from tensorflow.keras.callbacks import Callback
+from tensorflow.keras.preprocessing.sequence import pad_sequences
+
+# Import local modules
+import config
+from data_loader import data_generator
+from model_builder import define_model, define_training_model
+from preprocess_text import load_doc, load_descriptions, clean_descriptions, create_tokenizer
+from train import load_set_of_image_ids, filter_clean_descriptions, load_photo_features
+
+class StepTimer(Callback):
+    """Records the wall time of every training step after a short warm-up."""
+    def __init__(self, skip=5):
+        super().__init__()
+        self.skip = skip
+        self.times = []
+        self._seen = 0
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._seen += 1
+        if self._seen > self.skip:
+            self.times.append(time.perf_counter() - self._start)
+
+def greedy_decode(model, tokenizer, photos, max_length, batch_size=64):
+    """Batched greedy search (as CaptionGenerator) returning token lists."""
+    unk_index = tokenizer.word_index.get(config.UNK_TOKEN)
+    results = []
+    for start in range(0, len(photos), batch_size):
+        batch = photos[start:start + batch_size]
+        texts = [['startseq'] for _ in range(len(batch))]
+        done = [False] * len(batch)
+        for i in range(max_length):
+            active = [j for j in range(len(batch)) if not done[j]]
+            if not active: break
+            sequences = tokenizer.texts_to_sequences([' '.join(texts[j]) for j in active])
+            sequences = pad_sequences(sequences, maxlen=max_length)
+            yhat = model.predict([batch[active], sequences], verbose=0)
+            if unk_index is not None:
+                yhat[:, unk_index] = 0.0
+            for row, j in enumerate(active):
+                word = tokenizer.index_word.get(int(np.argmax(yhat[row])))
+                if word is None or word == 'endseq':
+                    done[j] = True
+                    continue
+                texts[j].append(word)
+        results.extend(t[1:] for t in texts)
+    return results
+
+def decode_step_time(model, max_length, repeats=50):
+    """Mean time of one single-caption decoder call, the per-word cost at inference."""
+    photo = np.zeros((1, 4096), dtype=np.float32)
+    sequence = np.zeros((1, max_length), dtype=np.int32)
+    model.predict([photo, sequence], verbose=0)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.predict([photo, sequence], verbose=0)
+    return (time.perf_counter() - start) / repeats
+
+def run_config(min_word_freq, sampled_softmax, args, data):
+    train_descriptions, train_features, test_keys, test_photos, references = data
+    max_length = config.MAX_LENGTH if config.MAX_LENGTH else 34
+
+    tokenizer = create_tokenizer(train_descriptions, min_word_freq)
+    vocab_size = len(tokenizer.word_index) + 1
+    print(f"--- min_word_freq={min_word_freq}, head={'sampled' if sampled_softmax else 'full'}, vocab={vocab_size} ---")
+
+    if sampled_softmax:
+        model = define_training_model(vocab_size, max_length, args.num_sampled)
+    else:
+        model = define_model(vocab_size, max_length)
+
+    generator = data_generator(train_descriptions, train_features, tokenizer, max_length, vocab_size,
+                               config.BATCH_SIZE, sparse_targets=sampled_softmax)
+    steps = args.steps or len(train_descriptions) // config.BATCH_SIZE
+    timer = StepTimer()
+    model.fit(generator, epochs=args.epochs, steps_per_epoch=steps, callbacks=[timer], verbose=0)
+
+    if sampled_softmax:
+        inference_model = define_model(vocab_size, max_length)
+        inference_model.set_weights(model.get_weights())
+        model = inference_model
+
+    hypotheses = greedy_decode(model, tokenizer, test_photos, max_length)
+    smoothing = SmoothingFunction().method1
+    bleu = [
+        corpus_bleu(references, hypotheses, weights=w, smoothing_function=smoothing)
+        for w in [(1, 0, 0, 0), (0.5, 0.5, 0, 0), (1/3, 1/3, 1/3, 0), (0.25, 0.25, 0.25, 0.25)]
+    ]
+
+    return {
+        'min_word_freq': min_word_freq,
+        'head': 'sampled' if sampled_softmax else 'full',
+        'vocab_size': vocab_size,
+        'train_step_s': float(np.mean(timer.times)) if timer.times else None,
+        'decode_step_s': decode_step_time(model, max_length),
+        'bleu1': bleu[0], 'bleu2': bleu[1], 'bleu3': bleu[2], 'bleu4': bleu[3],
+    }
+
+def load_data(max_test_images):
+    doc = load_doc(config.CAPTION_FILE)
+    descriptions = load_descriptions(doc)
+    clean_descriptions(descriptions)
+
+    train_ids = load_set_of_image_ids(config.RAW_DATA_DIR / "caption" / "Flickr_8k.trainImages.txt")
+    test_ids = load_set_of_image_ids(config.RAW_DATA_DIR / "caption" / "Flickr_8k.testImages.txt")
+    train_descriptions = filter_clean_descriptions(descriptions, train_ids)
+    train_features = load_photo_features(config.FEATURES_DICT_PATH, train_ids)
+
+    test_features = load_photo_features(config.FEATURES_DICT_PATH, test_ids)
+    test_keys = sorted(k for k in test_features if k in descriptions)[:max_test_images]
+    test_photos = np.array([np.array(test_features[k]).flatten() for k in test_keys], dtype=np.float32)
+    # References keep every word (rare ones included) and drop the sequence markers
+    references = [[d.split()[1:-1] for d in descriptions[k]] for k in test_keys]
+    return train_descriptions, train_features, test_keys, test_photos, references
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Step time and BLEU across vocabulary thresholds and softmax heads.")
+    parser.add_argument("--thresholds", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--heads", nargs="+", choices=["full", "sampled"], default=["full", "sampled"])
+    parser.add_argument("--num-sampled", type=int, default=config.NUM_SAMPLED)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--steps", type=int, default=None, help="Steps per epoch (default: a full pass).")
+    parser.add_argument("--test-images", type=int, default=1000)
+    parser.add_argument("--output", default=str(config.MODELS_DIR / "vocab_sweep.json"))
+    args = parser.parse_args()
+
+    data = load_data(args.test_images)
+    print(f"Evaluating on {len(data[2])} test images.")
+
+    results = []
+    for threshold in args.thresholds:
+        for head in args.heads:
+            results.append(run_config(threshold, head == "sampled", args, data))
+            print(json.dumps(results[-1]))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print("-" * 78)
+    print(f"{'min_freq':>8} {'head':>8} {'vocab':>6} {'train ms':>9} {'decode ms':>10} {'BLEU-1':>7} {'BLEU-4':>7}")
+    for r in results:
+        train_ms = r['train_step_s'] * 1000 if r['train_step_s'] is not None else float('nan')
+        print(f"{r['min_word_freq']:>8} {r['head']:>8} {r['vocab_size']:>6} {train_ms:>9.1f} "
+              f"{r['decode_step_s'] * 1000:>10.2f} {r['bleu1']:>7.4f} {r['bleu4']:>7.4f}")
+    print("-" * 78)
+    print(f"Saved results to {args.output}")
@@ -0,0 +1,242 @@
+import os
+import json
+import numpy as np
+
+# Import config
+try:
+    from src import config
+except ImportError:
+    import config
+
+# --- SHARED READ-ONLY WEIGHTS ---
+# TensorFlow copies weights into per-process variables, so N server workers
+# hold N copies. Here the large tensors (VGG16 fc1/fc2, ~470MB, and the whole
+# caption decoder) live in one flat file that every worker memory-maps
+# read-only and runs with NumPy. The OS keeps a single copy in the page cache.
+# Only the VGG16 conv trunk (~58MB) is still loaded into TensorFlow per worker.
+
+ALIGNMENT = 64
+MAGIC = b'CNWS0001'
+# File layout: MAGIC, uint64 little-endian index length, JSON index, padding,
+# then the arrays (each ALIGNMENT-aligned). Keeping the index inside the file
+# means a single os.replace swaps data and index together.
+
+def _align(n):
+    return n + (-n) % ALIGNMENT
+
+def export_weight_store(arrays, path, meta=None):
+    """
+    Writes named arrays and their index into one flat binary file.
+
+    Args:
+        arrays: Dict {name: np.ndarray}.
+        path: Output .bin file.
+        meta: Optional dict of extra values stored in the index.
+    """
+    os.makedirs(os.path.dirname(str(path)), exist_ok=True)
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    # Offsets are relative to the start of the data section
+    index = {'meta': meta or {}, 'arrays': {}}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        index['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    index['data_bytes'] = offset
+    header = json.dumps(index).encode('utf-8')
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    tmp_path = str(path) + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+        f.write(b'\0' * (data_start - f.tell()))
+        for name, array in arrays.items():
+            f.write(b'\0' * (data_start + index['arrays'][name]['offset'] - f.tell()))
+            f.write(array.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class WeightStore:
+    """Read-only, memory-mapped view of a file written by export_weight_store."""
+    def __init__(self, path=config.WEIGHT_STORE_PATH):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a weight store. Rebuild it with src/weight_store.py.")
+            header_length = int.from_bytes(f.read(8), 'little')
+            index = json.loads(f.read(header_length).decode('utf-8'))
+        self._data_start = _align(len(MAGIC) + 8 + header_length)
+
+        expected_size = self._data_start + index['data_bytes']
+        actual_size = os.path.getsize(path)
+        if actual_size != expected_size:
+            raise ValueError(f"{path} is truncated or corrupt ({actual_size} bytes, index expects {expected_size}).")
+
+        self.meta = index['meta']
+        self._arrays = index['arrays']
+        self._mmap = np.memmap(path, dtype=np.uint8, mode='r')
+
+    def __contains__(self, name):
+        return name in self._arrays
+
+    def __getitem__(self, name):
+        entry = self._arrays[name]
+        return np.ndarray(
+            tuple(entry['shape']), dtype=np.dtype(entry['dtype']),
+            buffer=self._mmap, offset=self._data_start + entry['offset']
+        )
+
+def _relu(x):
+    return np.maximum(x, 0.0)
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def _softmax(x):
+    x = x - x.max(axis=-1, keepdims=True)
+    e = np.exp(x)
+    return e / e.sum(axis=-1, keepdims=True)
+
+class MmapDecoder:
+    """
+    NumPy forward pass of model_builder.define_model over WeightStore arrays.
+    Exposes the predict([photo, sequence], verbose=0) call CaptionGenerator
+    uses, so greedy and beam search run unchanged.
+    """
+    def __init__(self, store):
+        self.image_kernel, self.image_bias = store['decoder/image_dense/kernel'], store['decoder/image_dense/bias']
+        self.embedding = store['decoder/embedding']
+        self.lstm_kernel = store['decoder/lstm/kernel']
+        self.lstm_recurrent = store['decoder/lstm/recurrent_kernel']
+        self.lstm_bias = store['decoder/lstm/bias']
+        self.hidden_kernel, self.hidden_bias = store['decoder/decoder_dense/kernel'], store['decoder/decoder_dense/bias']
+        self.output_kernel, self.output_bias = store['decoder/output/kernel'], store['decoder/output/bias']
+        self.feature_dim = self.image_kernel.shape[0]
+        self.units = self.lstm_recurrent.shape[0]
+
+    def predict(self, inputs, verbose=0):
+        photo, sequence = inputs
+        photo = np.asarray(photo, dtype=np.float32)
+        sequence = np.asarray(sequence)
+        units = self.units
+
+        # Image branch (dropout is inactive at inference)
+        image = _relu(photo @ self.image_kernel + self.image_bias)
+
+        # Text branch: masked LSTM (Keras gate order i, f, c, o); padded steps keep the state
+        projected = self.embedding[sequence] @ self.lstm_kernel + self.lstm_bias
+        h = np.zeros((sequence.shape[0], units), dtype=np.float32)
+        c = np.zeros_like(h)
+        for t in range(sequence.shape[1]):
+            z = projected[:, t] + h @ self.lstm_recurrent
+            i = _sigmoid(z[:, :units])
+            f = _sigmoid(z[:, units:2 * units])
+            g = np.tanh(z[:, 2 * units:3 * units])
+            o = _sigmoid(z[:, 3 * units:])
+            c_new = f * c + i * g
+            h_new = o * np.tanh(c_new)
+            mask = (sequence[:, t] != 0)[:, None]
+            h = np.where(mask, h_new, h)
+            c = np.where(mask, c_new, c)
+
+        hidden = _relu((image + h) @ self.hidden_kernel + self.hidden_bias)
+        return _softmax(hidden @ self.output_kernel + self.output_bias)
+
+class MmapEncoder:
+    """
+    VGG16 up to fc2 with the conv trunk in TensorFlow and the fully connected
+    layers (the bulk of the weights) in NumPy over the WeightStore.
+    """
+    def __init__(self, store):
+        from tensorflow.keras.applications.vgg16 import VGG16
+        self.trunk = VGG16(weights='imagenet', include_top=False)
+        self.fc1_kernel, self.fc1_bias = store['vgg16/fc1/kernel'], store['vgg16/fc1/bias']
+        self.fc2_kernel, self.fc2_bias = store['vgg16/fc2/kernel'], store['vgg16/fc2/bias']
+
+    def predict(self, image, verbose=0):
+        pooled = self.trunk.predict(image, verbose=verbose)
+        flat = pooled.reshape((pooled.shape[0], -1))
+        fc1 = _relu(flat @ self.fc1_kernel + self.fc1_bias)
+        return _relu(fc1 @ self.fc2_kernel + self.fc2_bias)
+
+def decoder_arrays(model):
+    """Names the weights of a define_model() decoder by role."""
+    from tensorflow.keras.layers import Dense, Embedding, LSTM
+    arrays = {}
+    dense_layers = []
+    for layer in model.layers:
+        weights = layer.get_weights()
+        if isinstance(layer, Embedding):
+            arrays['decoder/embedding'] = weights[0]
+        elif isinstance(layer, LSTM):
+            arrays['decoder/lstm/kernel'], arrays['decoder/lstm/recurrent_kernel'], arrays['decoder/lstm/bias'] = weights
+        elif isinstance(layer, Dense):
+            dense_layers.append(weights)
+
+    # Shapes can collide (e.g. vocab_size == 256), so roles follow the layer
+    # order of define_model(): image Dense, decoder Dense, output Dense
+    roles = ['image_dense', 'decoder_dense', 'output']
+    if len(dense_layers) != len(roles):
+        raise ValueError(f"Expected {len(roles)} Dense layers in the decoder, found {len(dense_layers)}.")
+    for role, (kernel, bias) in zip(roles, dense_layers):
+        arrays[f'decoder/{role}/kernel'], arrays[f'decoder/{role}/bias'] = kernel, bias
+    return arrays
+
+def verify_weight_store(path, model, vocab_size, max_length, samples=4):
+    """Checks that MmapDecoder over the store matches the Keras decoder."""
+    rng = np.random.default_rng(0)
+    # VGG16 fc2 features are non-negative (ReLU)
+    photo = np.abs(rng.standard_normal((samples, model.inputs[0].shape[-1]))).astype(np.float32)
+    # Left-padded like pad_sequences, with a different caption length per row
+    sequence = np.zeros((samples, max_length), dtype=np.int32)
+    for row, length in enumerate(np.linspace(1, max_length, samples).astype(int)):
+        sequence[row, max_length - length:] = rng.integers(1, vocab_size, size=length)
+
+    expected = model.predict([photo, sequence], verbose=0)
+    actual = MmapDecoder(WeightStore(path)).predict([photo, sequence])
+    if not np.allclose(actual, expected, rtol=1e-4, atol=1e-6):
+        error = float(np.max(np.abs(actual - expected)))
+        raise ValueError(f"Weight store output differs from the Keras model (max abs error {error:.2e}). Export aborted.")
+    print("✅ Weight store output matches the Keras model.")
+
+def build_weight_store(path=config.WEIGHT_STORE_PATH):
+    """Exports the trained decoder and the VGG16 fc layers to a weight store."""
+    import pickle
+    from tensorflow.keras.applications.vgg16 import VGG16
+    try:
+        from src.model_builder import define_model
+    except ImportError:
+        from model_builder import define_model
+
+    with open(config.TOKENIZER_PATH, 'rb') as f:
+        tokenizer = pickle.load(f)
+    vocab_size = len(tokenizer.word_index) + 1
+    max_length = config.MAX_LENGTH if config.MAX_LENGTH else 34
+
+    print(f"Loading decoder weights from {config.FINAL_MODEL_PATH}...")
+    model = define_model(vocab_size, max_length)
+    model.load_weights(config.FINAL_MODEL_PATH)
+    arrays = decoder_arrays(model)
+
+    print("Loading VGG16 fully connected layers...")
+    vgg = VGG16(weights='imagenet')
+    for name in ('fc1', 'fc2'):
+        arrays[f'vgg16/{name}/kernel'], arrays[f'vgg16/{name}/bias'] = vgg.get_layer(name).get_weights()
+
+    # Write next to the target and only swap it in once it reproduces Keras
+    candidate_path = str(path) + ".candidate"
+    export_weight_store(arrays, candidate_path, meta={'vocab_size': vocab_size, 'max_length': max_length})
+    try:
+        verify_weight_store(candidate_path, model, vocab_size, max_length)
+    except ValueError:
+        os.remove(candidate_path)
+        raise
+    os.replace(candidate_path, path)
+    total_mb = sum(a.nbytes for a in arrays.values()) / (1024.0 * 1024.0)
+    print(f"🎉 Wrote {len(arrays)} arrays ({total_mb:.1f} MB) to {path}")
+
+if __name__ == "__main__":
+    build_weight_store()